@@ -11,8 +11,5 @@ fi
 # ensure PYTHONPATH so src/ works
 export PYTHONPATH=.
 
-# run the scanner
-python -m src.boris_scanner
-
-# build the HTML/MD report
-python src/boris_report.py || true
+# scan and build the HTML/MD report in one process
+python -m src.boris_pipeline
@@ -0,0 +1,59 @@
+from __future__ import annotations
+import os, sys, argparse, logging
+
+from src.utils import load_cfg, report_profile
+from src import boris_scanner, boris_report
+
+# Scan and report in one process: the scanner's alert rows go straight into
+# the report's ranking and rendering instead of through boris_alerts.csv
+# (which is still written unless write_alerts_csv: false).
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(root: str = ROOT, merge: int | None = None, shard_dir: str | None = None,
+        run_id: str | None = None, archive: str | None = None) -> int:
+    # merge=None scans here; otherwise merge shard partials (0 = detect count)
+    if merge is None:
+        exit_code, alerts = boris_scanner.scan_all(root, archive=archive)
+    else:
+        exit_code, alerts = boris_scanner.merge_all(root, merge or None, shard_dir, run_id)
+    if not alerts:
+        return exit_code
+
+    # with several profiles, report_profile picks the one that is published
+    cfg = load_cfg(os.path.join(root, "config.yaml"))
+    try:
+        profile = report_profile(cfg)
+    except ValueError as e:
+        logging.error(str(e))
+        return exit_code
+
+    try:
+        boris_report.publish(boris_report.alerts_frame(alerts[profile]))
+    except Exception as e:
+        # a failed report must not hide the scan result
+        logging.exception(f"Report failed: {e}")
+    return exit_code
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Boris scan + report in one process.")
+    ap.add_argument("--merge", metavar="N", nargs="?", type=int, const=0,
+                    help="report from merged shard partials instead of scanning")
+    ap.add_argument("--shard-dir")
+    ap.add_argument("--run-id", help="run id the shards were started with (required with --merge)")
+    ap.add_argument("--archive", metavar="ZIP", help="read histories from a local Stooq daily archive")
+    args = ap.parse_args()
+    if args.merge is not None or args.run_id:
+        try:
+            boris_scanner.require_run_id(args.run_id)
+        except ValueError as e:
+            ap.error(str(e))
+    if args.archive and args.merge is not None:
+        ap.error("--archive applies to scanning, not to --merge")
+    sys.exit(run(merge=args.merge, shard_dir=args.shard_dir, run_id=args.run_id, archive=args.archive))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import os, sys, json, datetime as dt
 import pandas as pd
 
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 OUTDIR = "out"
 os.makedirs(OUTDIR, exist_ok=True)
 
@@ -11,10 +12,10 @@ RANK = {
     "GOOD BUY": 100,    "GOOD SELL": 100,
 }
 
-def load_alerts(path="boris_alerts.csv") -> pd.DataFrame:
-    if not os.path.exists(path):
-        return pd.DataFrame(columns=["date","ticker","consensus","buys","sells"])
-    df = pd.read_csv(path)
+ALERT_COLS = ["date","ticker","consensus","buys","sells"]
+
+def rank_alerts(df: pd.DataFrame) -> pd.DataFrame:
+    # normalise types, then strongest first: rank, vote margin, ticker
     if df.empty:
         return df
     df["date"] = pd.to_datetime(df["date"], errors="coerce")
@@ -28,6 +29,22 @@ def load_alerts(path="boris_alerts.csv") -> pd.DataFrame:
     df = df.sort_values(["date","rank","margin","ticker"], ascending=[False,False,False,True]).reset_index(drop=True)
     return df
 
+def load_alerts(path="boris_alerts.csv") -> pd.DataFrame:
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=ALERT_COLS)
+    return rank_alerts(pd.read_csv(path))
+
+def alerts_frame(rows: list[dict]) -> pd.DataFrame:
+    """Alerts straight from the scanner's result dicts, no CSV round trip."""
+    df = pd.DataFrame([{
+        "date": r.get("timestamp"),
+        "ticker": r.get("ticker"),
+        "consensus": r.get("consensus"),
+        "buys": r.get("buys", 0),
+        "sells": r.get("sells", 0),
+    } for r in rows], columns=ALERT_COLS)
+    return rank_alerts(df)
+
 def summarize(df: pd.DataFrame):
     if df.empty: return "No alerts."
     vc = df["consensus"].value_counts()
@@ -46,16 +63,22 @@ def color_for(label: str) -> str:
 def badge(label: str) -> str:
     return f'<span class="badge" style="background:{color_for(label)}">{(label or "").upper()}</span>'
 
+def render_markdown(df: pd.DataFrame) -> str:
+    out = [f"# Boris Consensus Alerts — {dt.datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"]
+    if df.empty:
+        out.append("_No alerts this run._\n")
+        return "".join(out)
+    out.append(summarize(df) + "\n\n")
+    out.append("| Date | Ticker | Consensus | Buys | Sells |\n|---|---|---:|---:|---:|\n")
+    for _, r in df.iterrows():
+        out.append(f"| {r['date'].date()} | {r['ticker']} | {r['consensus']} | {r['buys']} | {r['sells']} |\n")
+    return "".join(out)
+
 def to_markdown(df: pd.DataFrame, path_md: str):
     with open(path_md, "w") as f:
-        f.write(f"# Boris Consensus Alerts — {dt.datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n")
-        if df.empty: f.write("_No alerts this run._\n"); return
-        f.write(summarize(df) + "\n\n")
-        f.write("| Date | Ticker | Consensus | Buys | Sells |\n|---|---|---:|---:|---:|\n")
-        for _, r in df.iterrows():
-            f.write(f"| {r['date'].date()} | {r['ticker']} | {r['consensus']} | {r['buys']} | {r['sells']} |\n")
+        f.write(render_markdown(df))
 
-def to_html(df: pd.DataFrame, path_html: str):
+def render_html(df: pd.DataFrame) -> str:
     now = dt.datetime.now().strftime("%Y-%m-%d %H:%M")
     title = f"Boris Consensus Alerts — {now}"
     summary = summarize(df)
@@ -199,11 +222,27 @@ def to_html(df: pd.DataFrame, path_html: str):
     </div>
   </div>
 </body></html>"""
+    return html
+
+def to_html(df: pd.DataFrame, path_html: str):
     with open(path_html, "w") as f:
-        f.write(html)
+        f.write(render_html(df))
 
-def main():
-    df = load_alerts()
+def render_feed(df: pd.DataFrame) -> str:
+    return json.dumps({"updated": dt.datetime.utcnow().isoformat()+"Z",
+                       "alerts": df.to_dict(orient="records")}, default=str, indent=2)
+
+def build(path: str | None = None) -> int:
+    # default follows config.yaml: output_dir and report_profile
+    if path is None:
+        from src.utils import report_alerts_path
+        path = report_alerts_path(ROOT)
+    if not os.path.exists(path):
+        print(f"Alerts file not found: {path} (run the scanner first)", file=sys.stderr)
+        return 1
+    return publish(load_alerts(path))
+
+def publish(df: pd.DataFrame) -> int:
     print("=== BORIS CONSENSUS SUMMARY ===")
     print(summarize(df))
     if not df.empty:
@@ -213,19 +252,15 @@ def main():
     to_markdown(df, os.path.join(OUTDIR, "boris_report.md"))
     to_html(df, os.path.join(OUTDIR, "boris_report.html"))
     with open(os.path.join(OUTDIR, "boris_feed.json"), "w") as f:
-        json.dump({"updated": dt.datetime.utcnow().isoformat()+"Z",
-                   "alerts": df.to_dict(orient="records")}, f, default=str, indent=2)
-    sys.exit(0)
+        f.write(render_feed(df))
+    return 0
 
-# helper retained for completeness
-def to_markdown(df: pd.DataFrame, path_md: str):
-    with open(path_md, "w") as f:
-        f.write(f"# Boris Consensus Alerts — {dt.datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n")
-        if df.empty: f.write("_No alerts this run._\n"); return
-        f.write(summarize(df) + "\n\n")
-        f.write("| Date | Ticker | Consensus | Buys | Sells |\n|---|---|---:|---:|---:|\n")
-        for _, r in df.iterrows():
-            f.write(f"| {r['date'].date()} | {r['ticker']} | {r['consensus']} | {r['buys']} | {r['sells']} |\n")
+def main():
+    # `python src/boris_report.py` puts src/ on sys.path, not the repo root
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    # optional path, e.g. boris_alerts_<profile>.csv for a named profile
+    sys.exit(build(*sys.argv[1:2]))
 
 if __name__ == "__main__":
     main()
@@ -1,12 +1,17 @@
 from __future__ import annotations
-import os, sys, logging, time, random, io
+import os, sys, argparse, logging, time, random, io, re, zipfile
 import requests
 import pandas as pd
 import yfinance as yf
 
-from src.utils import load_cfg, setup_logger, now_str, ensure_dir
-from src.indicators import add_indicators
+from src.utils import (load_cfg, load_profiles, setup_logger, now_str, today_str, ensure_dir, out_path,
+                       DEFAULT_PROFILE)
+from src.indicators import add_indicators, required_rows
 from src.consensus import indicator_signals, consensus_from_signals
+from src.transitions import load_state, save_state, results_state, diff_states
+from src.shards import (parse_shard, check_run_id, shard_of, partial_path, write_partial, iter_merged,
+                        run_partials, missing_partials, detect_shard_count, mismatched_partials,
+                        remove_partials, universe_key)
 
 def load_tickers(path: str) -> list[str]:
     with open(path, "r") as f:
@@ -19,18 +24,30 @@ def load_tickers(path: str) -> list[str]:
     return out
 
 
+def stooq_symbol(ticker: str) -> str:
+    base = ticker.strip().lower()
+    # If it doesn't already have a suffix (like .us, .de, .pl), default to .us
+    if not re.search(r"\.[a-z]{2,3}$", base):
+        base = f"{base}.us"
+    return base
+
+
+def period_days(period: str) -> int:
+    days = 365
+    try:
+        if str(period).endswith("d"):
+            days = int(str(period)[:-1])
+    except Exception:
+        pass
+    return days
+
+
 def fetch_history(ticker: str, period: str, interval: str) -> pd.DataFrame:
     """
     Fetch historical daily candles from Stooq (no API key).
     US stocks require the '.us' suffix, e.g., aapl.us
     """
-    import requests, io, re
-
-    # Build stooq symbol
-    base = ticker.strip().lower()
-    # If it doesn't already have a suffix (like .us, .de, .pl), default to .us
-    if not re.search(r"\.[a-z]{2,3}$", base):
-        base = f"{base}.us"
+    base = stooq_symbol(ticker)
 
     url = f"https://stooq.com/q/d/l/?s={base}&i=d"
     r = requests.get(url, timeout=12)
@@ -57,12 +74,7 @@ def fetch_history(ticker: str, period: str, interval: str) -> pd.DataFrame:
     }).sort_values("date").reset_index(drop=True)
 
     # Trim by period like '365d'
-    days = 365
-    try:
-        if str(period).endswith("d"):
-            days = int(str(period)[:-1])
-    except Exception:
-        pass
+    days = period_days(period)
     if len(df) > days:
         df = df.iloc[-days:].reset_index(drop=True)
 
@@ -139,24 +151,93 @@ def fetch_history(ticker: str, period: str, interval: str) -> pd.DataFrame:
         raise RuntimeError(f"No data for {ticker}") from (e if e else last_err)
 
 
-def scan_ticker(ticker: str, cfg: dict) -> dict | None:
+ARCHIVE_COLS = {
+    "<DATE>": "date",
+    "<OPEN>": "open",
+    "<HIGH>": "high",
+    "<LOW>": "low",
+    "<CLOSE>": "close",
+    "<VOL>": "volume",
+}
+
+
+def load_stooq_archive(path: str, tickers: list[str], period: str, interval: str) -> dict[str, pd.DataFrame]:
+    """
+    Bulk alternative to fetch_history: read a downloaded Stooq daily archive
+    (e.g. d_us_txt.zip, one <symbol>.txt per instrument) in a single pass.
+    Members are streamed from the ZIP without extracting; only the requested
+    tickers are parsed, each trimmed to the configured period.
+    """
+    if interval != "1d":
+        raise RuntimeError("Stooq archives are daily (1d) only")
+
+    wanted = {stooq_symbol(t): t for t in tickers}
+    days = period_days(period)
+    out: dict[str, pd.DataFrame] = {}
+
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            name = info.filename.rsplit("/", 1)[-1].lower()
+            if not name.endswith(".txt"):
+                continue
+            ticker = wanted.get(name[:-4])
+            if ticker is None or ticker in out:
+                continue
+            try:
+                with zf.open(info) as f:
+                    df = pd.read_csv(f, usecols=list(ARCHIVE_COLS), dtype={"<DATE>": str})
+            except (ValueError, pd.errors.EmptyDataError) as e:
+                logging.warning(f"{ticker}: unreadable archive member {info.filename}: {e}")
+                continue
+            if df.empty:
+                continue
+            df = df.rename(columns=ARCHIVE_COLS)
+            df["date"] = pd.to_datetime(df["date"], format="%Y%m%d")
+            df = df.sort_values("date").iloc[-days:].reset_index(drop=True)
+            out[ticker] = df
+
+    missing = len(tickers) - len(out)
+    logging.info(f"ARCHIVE: loaded {len(out)} of {len(tickers)} tickers from {path}"
+                 + (f" ({missing} not found)" if missing else ""))
+    return out
+
+
+def evaluate(ticker: str, df: pd.DataFrame, cfg: dict) -> dict:
+    last = df.iloc[-1]
+    sigs = indicator_signals(df, cfg)
+    label, buys, sells = consensus_from_signals(sigs, cfg)
+    return {
+        "ticker": ticker,
+        "timestamp": last["date"].strftime("%Y-%m-%d"),
+        "close": round(float(last["close"]), 4),
+        "buys": buys,
+        "sells": sells,
+        "consensus": label,
+        "votes": sigs,
+    }
+
+
+def scan_ticker(ticker: str, profiles: dict[str, dict], df: pd.DataFrame | None = None) -> dict[str, dict] | None:
+    """
+    Fetch once (unless the history is passed in), compute each distinct
+    indicator parameter set once, then evaluate signals and consensus per
+    profile. Returns {profile: result}.
+    """
+    base = next(iter(profiles.values()))
     try:
-        df = fetch_history(ticker, cfg["period"], cfg["interval"])
-        if len(df) < cfg.get("min_rows", 200):
-            logging.warning(f"{ticker}: insufficient rows {len(df)} < {cfg.get('min_rows',200)}")
+        if df is None:
+            df = fetch_history(ticker, base["period"], base["interval"])
+        usable = {}
+        for name, pcfg in profiles.items():
+            min_rows = max(pcfg.get("min_rows", 200), required_rows(pcfg))
+            if len(df) < min_rows:
+                logging.warning(f"{ticker}: insufficient rows {len(df)} < {min_rows} [{name}]")
+            else:
+                usable[name] = pcfg
+        if not usable:
             return None
-        df = add_indicators(df, cfg)
-        last = df.iloc[-1]
-        sigs = indicator_signals(last, cfg)
-        label, buys, sells = consensus_from_signals(sigs, cfg)
-        return {
-            "ticker": ticker,
-            "timestamp": last["date"].strftime("%Y-%m-%d"),
-            "close": round(float(last["close"]), 4),
-            "buys": buys,
-            "sells": sells,
-            "consensus": label,
-        }
+        df = add_indicators(df, *usable.values())
+        return {name: evaluate(ticker, df, pcfg) for name, pcfg in usable.items()}
     except Exception as e:
         logging.exception(f"{ticker}: scan failed: {e}")
         return None
@@ -177,62 +258,256 @@ def export_csv(rows: list[dict], path: str):
     pd.DataFrame(tidy, columns=cols).to_csv(path, index=False)
 
 
-def main():
-    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    cfg = load_cfg(os.path.join(root, "config.yaml"))
-    setup_logger(cfg.get("log_level", "INFO"))
-
-    tzname = cfg.get("timezone", "Europe/Zurich")
-    logging.info(f"Starting Boris daily scan @ {now_str(tzname)}")
-
-    tickers = load_tickers(os.path.join(root, "tickers.csv"))
-    logging.info(f"Tickers: {len(tickers)}")
-
-    results = []
-    for t in tickers:
-        r = scan_ticker(t, cfg)
-        if r:
-            results.append(r)
-        time.sleep(0.8)
-
-    outdir = cfg.get("output_dir", ".")
-    ensure_dir(outdir)
+def tier_score(label: str) -> int:
+    l = (label or "").upper()
+    if "DIAMOND" in l: return 3
+    if "STRONG"  in l: return 2
+    if "GOOD"    in l: return 1
+    return 0
+
+
+def persist_outputs(profile: str, results: list[dict], alerts: list[dict], cfg: dict,
+                    tickers: list[str], outdir: str, min_needed: int) -> list[dict]:
+    tag = "" if profile == DEFAULT_PROFILE else f" [{profile}]"
+
+    # transitions vs. the previous run's persisted state
+    state_path = out_path(outdir, os.path.splitext(cfg.get("state_file", "boris_state.csv"))[0], profile)
+    prev_state = load_state(state_path)
+    cur_state = results_state(results)
+    changes = diff_states(prev_state, cur_state, min_needed)
+    changes_path = out_path(outdir, "boris_transitions", profile)
+    changes.to_csv(changes_path, index=False)
+    save_state(prev_state, cur_state, tickers, state_path)
+    logging.info(f"TRANSITIONS{tag}: wrote {changes_path} ({len(changes)} rows)")
+    for _, c in changes.iterrows():
+        logging.info(f"{c['date']} | {c['ticker']} | {c['change']}: {c['prev_consensus']} -> {c['consensus']}")
+
+    if cfg.get("transitions_only", False):
+        changed = set(changes["ticker"])
+        alerts = [r for r in alerts if r["ticker"] in changed]
+
+    # the in-process pipeline hands alerts to the report directly; the CSV
+    # is then only an artifact and can be switched off
+    if cfg.get("write_alerts_csv", True):
+        alerts_path = out_path(outdir, "boris_alerts", profile)
+        export_csv(alerts, alerts_path)
+        logging.info(f"ALERTS{tag}: wrote {alerts_path} ({len(alerts)} rows)")
+    return alerts
+
+
+def finalize(profile: str, results: list[dict], cfg: dict, tickers: list[str], outdir: str,
+             persist: bool = True) -> tuple[int, list[dict]]:
+    """
+    Threshold, transitions and CSV output for one profile; returns the exit
+    code hint and the alert rows. With persist=False (ad-hoc scans) nothing
+    is written and the stored state is left untouched.
+    """
+    tag = "" if profile == DEFAULT_PROFILE else f" [{profile}]"
 
     # consensus threshold
-    def tier_score(label: str) -> int:
-        l = (label or "").upper()
-        if "DIAMOND" in l: return 3
-        if "STRONG"  in l: return 2
-        if "GOOD"    in l: return 1
-        return 0
-
     tier = cfg.get("alerts_min_consensus", "strong").lower()
     min_needed = {"good":1, "strong":2, "diamond":3}.get(tier, 2)
 
     alerts = [r for r in results if tier_score(r.get("consensus","")) >= min_needed]
 
-    alerts_path = os.path.join(outdir, "boris_alerts.csv")
-    export_csv(alerts, alerts_path)
-    logging.info(f"ALERTS: wrote {alerts_path} ({len(alerts)} rows)")
+    if persist:
+        alerts = persist_outputs(profile, results, alerts, cfg, tickers, outdir, min_needed)
 
     if alerts:
-        logging.info("==== CONSENSUS ALERTS ====")
+        logging.info(f"==== CONSENSUS ALERTS{tag} ====")
         for r in alerts:
             logging.info(f"{r['timestamp']} | {r['ticker']} | {r['consensus']} (buys={r['buys']}, sells={r['sells']})")
         logging.info("==== ================== ====")
     else:
-        logging.info("No consensus alerts this run.")
+        logging.info(f"No consensus alerts this run{tag}.")
 
     exit_code = 0
     if any("DIAMOND" in (r.get("consensus","")) for r in alerts):
         exit_code = 2
     elif any("STRONG" in (r.get("consensus","")) for r in alerts):
         exit_code = 1
+    return exit_code, alerts
+
+
+INCOMPLETE = 3  # exit code when no result could be produced (missing shards, unusable archive)
+
+
+def shard_dir_for(cfg: dict, override: str | None = None) -> str:
+    return override or cfg.get("shard_dir") or os.path.join(cfg.get("output_dir", "."), "shards")
+
+
+def require_run_id(run_id: str | None) -> str:
+    # no default: a date would be shared by every run of the day, and an
+    # earlier run's leftover partials would merge with the current ones
+    if not run_id:
+        raise ValueError("shard and merge runs need an explicit run id (--run-id)")
+    return check_run_id(run_id)
+
+
+def scan_all(root: str, tickers: list[str] | None = None, shard: tuple[int, int] | None = None,
+             shard_dir: str | None = None, archive: str | None = None,
+             run_id: str | None = None) -> tuple[int, dict[str, list[dict]]]:
+    """
+    Full scan of tickers.csv, or an ad-hoc scan of the given tickers (logged
+    only, no files written). Returns the exit code hint and the alert rows
+    per profile. With shard=(i, n) only that shard's tickers are scanned and
+    the results go to partial files for merge_all. With archive (or
+    stooq_archive in config) histories come from a local Stooq ZIP.
+    """
+    if shard and tickers:
+        raise ValueError("shard mode scans tickers.csv; ad-hoc tickers are not supported")
+    if shard:
+        run_id = require_run_id(run_id)
+
+    cfg = load_cfg(os.path.join(root, "config.yaml"))
+    setup_logger(cfg.get("log_level", "INFO"))
+
+    tzname = cfg.get("timezone", "Europe/Zurich")
+    logging.info(f"Starting Boris {'ad-hoc' if tickers else 'daily'} scan @ {now_str(tzname)}")
+
+    profiles = load_profiles(cfg)
+    if list(profiles) != [DEFAULT_PROFILE]:
+        logging.info(f"Profiles: {', '.join(profiles)}")
+
+    persist = not tickers
+    if persist:
+        tickers = load_tickers(os.path.join(root, "tickers.csv"))
+    universe = tickers
+    if shard:
+        i, n = shard
+        tickers = [t for t in universe if shard_of(t, n) == i]
+        logging.info(f"Shard {i}/{n}: {len(tickers)} of {len(universe)} tickers")
+    else:
+        logging.info(f"Tickers: {len(tickers)}")
+
+    # bulk ingestion from a local Stooq archive replaces per-ticker HTTP
+    archive = archive or cfg.get("stooq_archive")
+    history = None
+    if archive:
+        base = next(iter(profiles.values()))
+        try:
+            history = load_stooq_archive(archive, tickers, base["period"], base["interval"])
+        except (RuntimeError, OSError, zipfile.BadZipFile) as e:
+            logging.error(f"ARCHIVE: cannot use {archive}: {e}")
+            return INCOMPLETE, {}
+        tickers = [t for t in tickers if t in history]
+
+    results = {name: [] for name in profiles}
+    for k, t in enumerate(tickers):
+        if k and history is None:
+            time.sleep(0.8)
+        r = scan_ticker(t, profiles, history.pop(t) if history is not None else None)
+        if r:
+            for name, res in r.items():
+                results[name].append(res)
+
+    if shard:
+        sdir = shard_dir_for(cfg, shard_dir)
+        ensure_dir(sdir)
+        order = {t: k for k, t in enumerate(universe)}
+        meta = {"run": run_id, "shards": n, "universe": universe_key(universe), "date": today_str(tzname)}
+        for name in profiles:
+            path = partial_path(sdir, name, run_id, i, n)
+            write_partial(path, results[name], order, meta)
+            logging.info(f"PARTIAL: wrote {path} ({len(results[name])} rows)")
+        return 0, {}
+
+    return _finish(cfg, profiles, results, universe, persist)
+
+
+def merge_all(root: str, n: int | None = None, shard_dir: str | None = None,
+              run_id: str | None = None) -> tuple[int, dict[str, list[dict]]]:
+    """
+    Combine the shard partials of one run into the same alerts, transitions,
+    state and exit code a single-node run would have produced. Partials of
+    other runs are never used; partials of this run that disagree on shard
+    count, universe or scan date are rejected. The consumed ones are removed
+    afterwards.
+    """
+    rid = require_run_id(run_id)
+    cfg = load_cfg(os.path.join(root, "config.yaml"))
+    setup_logger(cfg.get("log_level", "INFO"))
+
+    profiles = load_profiles(cfg)
+    universe = load_tickers(os.path.join(root, "tickers.csv"))
+    sdir = shard_dir_for(cfg, shard_dir)
+
+    counts, results = {}, {}
+    for name in profiles:
+        count = n or detect_shard_count(sdir, name, rid)
+        if not count:
+            logging.error(f"No consistent set of partials for '{name}' run {rid} in {sdir}")
+            return INCOMPLETE, {}
+        mixed = {c for _, c in run_partials(sdir, name, rid)} - {count}
+        if mixed:
+            logging.error(f"Partials for '{name}' run {rid} mix shard counts {sorted(mixed | {count})}")
+            return INCOMPLETE, {}
+        missing = missing_partials(sdir, name, rid, count)
+        if missing:
+            logging.error(f"Missing partials for '{name}' run {rid}: shards {missing} of {count}")
+            return INCOMPLETE, {}
+        problems = mismatched_partials(sdir, name, rid, count, universe)
+        if problems:
+            for msg in problems:
+                logging.error(f"Partials for '{name}' run {rid} do not belong together: {msg}")
+            return INCOMPLETE, {}
+        counts[name] = count
+        results[name] = list(iter_merged(sdir, name, rid, count))
+        logging.info(f"MERGE: {count} shards -> {len(results[name])} results [{name}]")
+
+    outcome = _finish(cfg, profiles, results, universe, True)
+    for name, count in counts.items():
+        remove_partials(sdir, name, rid, count)
+    return outcome
+
+
+def _finish(cfg: dict, profiles: dict[str, dict], results: dict[str, list[dict]],
+            tickers: list[str], persist: bool) -> tuple[int, dict[str, list[dict]]]:
+    outdir = cfg.get("output_dir", ".")
+    ensure_dir(outdir)
+
+    exit_code, alerts = 0, {}
+    for name, pcfg in profiles.items():
+        code, alerts[name] = finalize(name, results[name], pcfg, tickers, outdir, persist)
+        exit_code = max(exit_code, code)
 
     logging.info(f"Done. Exit code hint = {exit_code}")
-    sys.exit(exit_code)
+    return exit_code, alerts
+
+
+def run(root: str, tickers: list[str] | None = None, archive: str | None = None) -> int:
+    return scan_all(root, tickers, archive=archive)[0]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Boris consensus scanner.")
+    ap.add_argument("--shard", metavar="I/N", help="scan only shard I of N and write a partial file")
+    ap.add_argument("--merge", metavar="N", nargs="?", type=int, const=0,
+                    help="merge shard partials (N detected from the files if omitted)")
+    ap.add_argument("--shard-dir", help="directory shared by shards and merge (default: <output_dir>/shards)")
+    ap.add_argument("--archive", metavar="ZIP", help="read histories from a local Stooq daily archive")
+    ap.add_argument("--run-id", help="id shared by the shards and merge of one run (required with --shard/--merge)")
+    args = ap.parse_args()
+    if args.shard and args.merge is not None:
+        ap.error("--shard and --merge are mutually exclusive")
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if args.shard or args.merge is not None or args.run_id:
+        try:
+            require_run_id(args.run_id)
+        except ValueError as e:
+            ap.error(str(e))
+    if args.merge is not None:
+        sys.exit(merge_all(root, args.merge or None, args.shard_dir, args.run_id)[0])
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            ap.error(str(e))
+        sys.exit(scan_all(root, shard=shard, shard_dir=args.shard_dir, archive=args.archive,
+                          run_id=args.run_id)[0])
+    sys.exit(run(root, archive=args.archive))
 
 
 if __name__ == "__main__":
     main()
-
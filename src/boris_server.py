@@ -0,0 +1,257 @@
+from __future__ import annotations
+import os, sys, argparse, asyncio, gzip, hashlib, logging, signal
+from email.utils import formatdate
+
+from src.utils import setup_logger, report_alerts_path
+from src.boris_report import ROOT, load_alerts, render_html, render_markdown, render_feed
+
+# Serves the report, markdown and JSON feed straight from memory.
+# Everything is rendered once per alerts file change; requests only pick
+# a pre-built buffer (plain or gzip) and compare ETags.
+
+CONTENT_TYPES = {
+    "html": "text/html; charset=utf-8",
+    "md":   "text/markdown; charset=utf-8",
+    "json": "application/json; charset=utf-8",
+}
+
+ROUTES = {
+    "/": "html",
+    "/index.html": "html",
+    "/boris_report.html": "html",
+    "/boris_report.md": "md",
+    "/boris_feed.json": "json",
+}
+
+MAX_HEADER_LINES = 100
+IDLE_TIMEOUT = 30.0
+
+
+class Asset:
+    """One pre-rendered document: identity and gzip bodies plus ready-made headers."""
+
+    def __init__(self, body: bytes, content_type: str, last_modified: str):
+        self.body = body
+        self.gz = gzip.compress(body, compresslevel=6)
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        # each representation gets its own strong validator
+        self.etag = f'"{digest}"'
+        self.etag_gz = f'"{digest}-gz"'
+        common = (
+            f"Content-Type: {content_type}\r\n"
+            f"Last-Modified: {last_modified}\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Vary: Accept-Encoding\r\n"
+        )
+        self.head_plain = (
+            "HTTP/1.1 200 OK\r\n" + common + f"ETag: {self.etag}\r\n"
+            f"Content-Length: {len(self.body)}\r\n"
+        ).encode()
+        self.head_gzip = (
+            "HTTP/1.1 200 OK\r\n" + common + f"ETag: {self.etag_gz}\r\n"
+            "Content-Encoding: gzip\r\n"
+            f"Content-Length: {len(self.gz)}\r\n"
+        ).encode()
+        self.head_304 = self._not_modified(self.etag)
+        self.head_304_gz = self._not_modified(self.etag_gz)
+
+    @staticmethod
+    def _not_modified(etag: str) -> bytes:
+        return (
+            "HTTP/1.1 304 Not Modified\r\n"
+            f"ETag: {etag}\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Vary: Accept-Encoding\r\n"
+        ).encode()
+
+
+def build_snapshot(alerts_path: str) -> dict[str, Asset]:
+    df = load_alerts(alerts_path)
+    try:
+        mtime = os.stat(alerts_path).st_mtime
+    except OSError:
+        mtime = None
+    last_modified = formatdate(mtime, usegmt=True)
+    docs = {
+        "html": render_html(df),
+        "md":   render_markdown(df),
+        "json": render_feed(df),
+    }
+    return {k: Asset(v.encode("utf-8"), CONTENT_TYPES[k], last_modified) for k, v in docs.items()}
+
+
+def accepts_gzip(header: str) -> bool:
+    """Accept-Encoding negotiation for gzip, honouring q-values (q=0 means no)."""
+    gzip_q = star_q = None
+    for item in header.split(","):
+        coding, *params = [x.strip() for x in item.split(";")]
+        q = 1.0
+        for prm in params:
+            k, _, v = prm.partition("=")
+            if k.strip().lower() == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        coding = coding.lower()
+        if coding in ("gzip", "x-gzip"):
+            gzip_q = q
+        elif coding == "*":
+            star_q = q
+    if gzip_q is not None:
+        return gzip_q > 0
+    return star_q is not None and star_q > 0
+
+
+def _simple(status: str, keep_alive: bool) -> bytes:
+    body = status.encode()
+    conn = "keep-alive" if keep_alive else "close"
+    return (
+        f"HTTP/1.1 {status}\r\nContent-Type: text/plain\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: {conn}\r\n\r\n"
+    ).encode() + body
+
+
+class ReportServer:
+    def __init__(self, alerts_path: str, interval: float = 5.0):
+        self.alerts_path = alerts_path
+        self.interval = interval
+        self.snapshot = build_snapshot(alerts_path)
+        self._mtime = self._stat()
+        self._reloading = False
+
+    def _stat(self):
+        try:
+            return os.stat(self.alerts_path).st_mtime_ns
+        except OSError:
+            return None
+
+    async def reload(self):
+        if self._reloading:
+            return
+        self._reloading = True
+        try:
+            loop = asyncio.get_running_loop()
+            snap = await loop.run_in_executor(None, build_snapshot, self.alerts_path)
+            # single reference swap: in-flight requests keep the old buffers
+            self.snapshot = snap
+            logging.info(f"Reloaded report from {self.alerts_path}")
+        except Exception as e:
+            logging.exception(f"Reload failed, keeping previous snapshot: {e}")
+        finally:
+            self._reloading = False
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            mtime = self._stat()
+            if mtime != self._mtime:
+                self._mtime = mtime
+                await self.reload()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except (asyncio.LimitOverrunError, ValueError):
+                    # request line over the stream limit
+                    writer.write(_simple("414 URI Too Long", False))
+                    break
+                if not line:
+                    break
+                parts = line.decode("latin-1").split()
+                if len(parts) != 3:
+                    writer.write(_simple("400 Bad Request", False))
+                    break
+                method, target, version = parts
+
+                headers, too_large = {}, True
+                try:
+                    for _ in range(MAX_HEADER_LINES):
+                        h = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                        if h in (b"\r\n", b"\n", b""):
+                            too_large = False
+                            break
+                        k, _, v = h.decode("latin-1").partition(":")
+                        headers[k.strip().lower()] = v.strip()
+                except (asyncio.LimitOverrunError, ValueError):
+                    # a single header line over the stream limit
+                    pass
+                if too_large:
+                    writer.write(_simple("431 Request Header Fields Too Large", False))
+                    break
+
+                conn = headers.get("connection", "").lower()
+                keep_alive = conn != "close" if version == "HTTP/1.1" else conn == "keep-alive"
+
+                if method not in ("GET", "HEAD"):
+                    # the body is never read, so the connection can't be reused
+                    writer.write(_simple("405 Method Not Allowed", False))
+                    break
+                writer.write(self.respond(method, target, headers, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    def respond(self, method: str, target: str, headers: dict, keep_alive: bool) -> bytes:
+        kind = ROUTES.get(target.split("?", 1)[0])
+        if kind is None:
+            return _simple("404 Not Found", keep_alive)
+        asset = self.snapshot[kind]
+        tail = b"Connection: keep-alive\r\n\r\n" if keep_alive else b"Connection: close\r\n\r\n"
+
+        if accepts_gzip(headers.get("accept-encoding", "")):
+            head, body, etag, not_modified = asset.head_gzip, asset.gz, asset.etag_gz, asset.head_304_gz
+        else:
+            head, body, etag, not_modified = asset.head_plain, asset.body, asset.etag, asset.head_304
+
+        inm = headers.get("if-none-match")
+        if inm and (inm == "*" or etag in [t.strip().removeprefix("W/") for t in inm.split(",")]):
+            return not_modified + tail
+        return head + tail if method == "HEAD" else head + tail + body
+
+
+async def serve(host: str, port: int, alerts_path: str, interval: float):
+    srv = ReportServer(alerts_path, interval)
+    server = await asyncio.start_server(srv.handle, host, port, backlog=4096)
+    loop = asyncio.get_running_loop()
+    if hasattr(signal, "SIGHUP"):
+        loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(srv.reload()))
+    watcher = asyncio.create_task(srv.watch())
+    logging.info(f"Serving Boris report on http://{host}:{port}/ (alerts={alerts_path})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve the Boris report and feed from memory.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8787)
+    ap.add_argument("--alerts", help="alerts CSV written by the scanner "
+                                      "(default: report_profile's file per config.yaml)")
+    ap.add_argument("--interval", type=float, default=5.0, help="seconds between alerts file checks")
+    args = ap.parse_args()
+
+    setup_logger("INFO")
+    alerts = args.alerts or report_alerts_path(ROOT)
+    if not os.path.exists(alerts):
+        logging.warning(f"{alerts} does not exist yet; serving an empty report until it appears")
+    try:
+        asyncio.run(serve(args.host, args.port, alerts, args.interval))
+    except KeyboardInterrupt:
+        pass
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+from __future__ import annotations
+import os, sys, argparse, contextlib, io, json, logging, socket, socketserver, time
+
+# Warm worker: one long-lived process that has pandas, yfinance and
+# pandas_ta imported already and runs scan/report jobs sent over a local
+# Unix socket. The client side below only uses the standard library, so
+# submitting a job costs an interpreter start and nothing else.
+#
+#   python -m src.boris_worker serve            # keep running (launchd/tmux)
+#   python -m src.boris_worker scan             # full scan of tickers.csv
+#   python -m src.boris_worker scan AAPL NVDA   # ad-hoc scan, nothing written
+#   python -m src.boris_worker report [alerts.csv]
+#   python -m src.boris_worker pipeline         # scan + report in one job
+#
+# The client exits with the job's exit code hint (0/1/2), or 3 if the
+# worker could not be reached or the job failed.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SOCKET = os.environ.get("BORIS_SOCKET", os.path.join(ROOT, "boris_worker.sock"))
+UNAVAILABLE = 3
+REQUEST_TIMEOUT = 10.0
+
+
+class _Capture(logging.Handler):
+    """Collects the log lines of one job so the client can print them."""
+
+    def __init__(self):
+        super().__init__()
+        self.lines: list[str] = []
+        self.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(message)s"))
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    # jobs are served one at a time, so a client that never finishes its
+    # request line must not hold up the queue
+    timeout = REQUEST_TIMEOUT
+
+    def handle(self):
+        try:
+            line = self.rfile.readline()
+        except OSError as e:
+            logging.warning(f"Dropped client: no request within {self.timeout:.0f}s ({e})")
+            return
+        try:
+            job = json.loads(line or b"{}")
+        except ValueError as e:
+            return self._reply({"ok": False, "error": f"bad request: {e}", "exit_code": UNAVAILABLE})
+        if not isinstance(job, dict):
+            return self._reply({"ok": False, "error": "bad request: expected a JSON object",
+                                "exit_code": UNAVAILABLE})
+        self._reply(self.server.run_job(job))
+
+    def _reply(self, obj: dict):
+        self.wfile.write((json.dumps(obj) + "\n").encode())
+
+
+class WorkerServer(socketserver.UnixStreamServer):
+    # jobs run one at a time in the server thread; the scanner writes shared
+    # state files, so serial execution is what we want anyway
+
+    def __init__(self, path: str):
+        super().__init__(path, _Handler)
+        from src import boris_scanner, boris_report, boris_pipeline
+        self.scanner = boris_scanner
+        self.report = boris_report
+        self.pipeline = boris_pipeline
+
+    def run_job(self, job: dict) -> dict:
+        kind = job.get("job")
+        cap = _Capture()
+        logging.getLogger().addHandler(cap)
+        # the report prints its summary table; hand that back as well
+        out = io.StringIO()
+        t0 = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(out):
+                if kind == "ping":
+                    code = 0
+                elif kind == "scan":
+                    code = self.scanner.run(ROOT, job.get("tickers") or None)
+                elif kind == "report":
+                    code = self.report.build(job.get("alerts") or None)
+                elif kind == "pipeline":
+                    code = self.pipeline.run(ROOT)
+                else:
+                    return {"ok": False, "error": f"unknown job: {kind!r}", "exit_code": UNAVAILABLE}
+            return {"ok": True, "exit_code": int(code), "log": cap.lines, "stdout": out.getvalue(),
+                    "elapsed": round(time.perf_counter() - t0, 3)}
+        except SystemExit as e:
+            return {"ok": True, "exit_code": int(e.code or 0), "log": cap.lines, "stdout": out.getvalue()}
+        except Exception as e:
+            logging.exception(f"{kind}: job failed: {e}")
+            return {"ok": False, "error": str(e), "exit_code": UNAVAILABLE, "log": cap.lines,
+                    "stdout": out.getvalue()}
+        finally:
+            logging.getLogger().removeHandler(cap)
+
+
+def serve(path: str):
+    from src.utils import setup_logger
+    setup_logger("INFO")
+    os.chdir(ROOT)
+
+    # preload the heavy imports once; this is the whole point of the worker
+    t0 = time.perf_counter()
+    import pandas, yfinance, pandas_ta  # noqa: F401
+    logging.info(f"Preloaded pandas/yfinance/pandas_ta in {time.perf_counter() - t0:.2f}s")
+
+    if os.path.exists(path):
+        # refuse to steal a socket from a live worker
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                s.connect(path)
+            logging.error(f"A worker is already listening on {path}")
+            return 1
+        except OSError:
+            os.unlink(path)
+
+    with WorkerServer(path) as srv:
+        os.chmod(path, 0o600)
+        logging.info(f"Boris worker listening on {path}")
+        try:
+            srv.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+    return 0
+
+
+def submit(path: str, job: dict, timeout: float | None = None) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(path)
+        s.sendall((json.dumps(job) + "\n").encode())
+        buf = b""
+        while not buf.endswith(b"\n"):
+            chunk = s.recv(65536)
+            if not chunk:
+                break
+            buf += chunk
+    return json.loads(buf)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Boris warm worker and client.")
+    ap.add_argument("--socket", default=DEFAULT_SOCKET)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("serve", help="start the worker")
+    sub.add_parser("ping", help="check that the worker is up")
+    p_scan = sub.add_parser("scan", help="run a scan job")
+    p_scan.add_argument("tickers", nargs="*", help="ad-hoc tickers (default: tickers.csv)")
+    p_rep = sub.add_parser("report", help="build the HTML/MD/JSON report")
+    p_rep.add_argument("alerts", nargs="?", help="alerts CSV (default: report_profile's file)")
+    sub.add_parser("pipeline", help="scan and report in one job")
+    args = ap.parse_args()
+
+    if args.cmd == "serve":
+        sys.exit(serve(args.socket))
+
+    job = {"job": args.cmd}
+    if args.cmd == "scan":
+        job["tickers"] = args.tickers
+    elif args.cmd == "report":
+        # the worker runs from ROOT, so send an absolute path
+        job["alerts"] = os.path.abspath(args.alerts) if args.alerts else None
+
+    try:
+        res = submit(args.socket, job)
+    except (OSError, ValueError) as e:
+        print(f"boris worker not reachable at {args.socket}: {e}", file=sys.stderr)
+        sys.exit(UNAVAILABLE)
+
+    for line in res.get("log", []):
+        print(line)
+    if res.get("stdout"):
+        sys.stdout.write(res["stdout"])
+    if not res.get("ok"):
+        print(f"job failed: {res.get('error')}", file=sys.stderr)
+    sys.exit(res.get("exit_code", UNAVAILABLE))
+
+
+if __name__ == "__main__":
+    main()
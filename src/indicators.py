@@ -1,41 +1,302 @@
 from __future__ import annotations
+from dataclasses import dataclass
+from typing import Callable
+import numpy as np
 import pandas as pd
 import pandas_ta as ta
 
-def add_indicators(df: pd.DataFrame, cfg: dict) -> pd.DataFrame:
-    # Ensure standard OHLCV columns exist
+# ---------------------------------------------------------------------------
+# Shared intermediates
+#
+# Keltner and Supertrend both need true range / ATR, MACD and Keltner both
+# need EMAs of close. Each ticker gets one Intermediates cache so these are
+# computed once and shared by every indicator that asks for them. The
+# formulas follow pandas_ta (SMA-seeded EMA, Wilder RMA for ATR/RSI).
+# ---------------------------------------------------------------------------
+
+def ema(s: pd.Series, length: int) -> pd.Series:
+    # pandas_ta's ema: seed bar length-1 with the mean of the first `length`
+    # values (NaNs skipped, as for true range's empty first bar)
+    if len(s) < length:
+        return pd.Series(np.nan, index=s.index)
+    s = s.copy()
+    seed = s.iloc[:length].mean()
+    s.iloc[:length - 1] = np.nan
+    s.iloc[length - 1] = seed
+    return s.ewm(span=length, adjust=False).mean()
+
+
+def rma(s: pd.Series, length: int) -> pd.Series:
+    return s.ewm(alpha=1.0 / length, min_periods=length).mean()
+
+
+class Intermediates:
+    """Per-ticker cache of series shared between indicators."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._cache: dict[tuple, pd.Series] = {}
+
+    def _get(self, key: tuple, fn: Callable[[], pd.Series]) -> pd.Series:
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    def tr(self) -> pd.Series:
+        def build():
+            h, l, c = self.df["high"], self.df["low"], self.df["close"]
+            pc = c.shift(1)
+            out = pd.concat([h - l, (h - pc).abs(), (pc - l).abs()], axis=1).max(axis=1)
+            out.iloc[:1] = np.nan
+            return out
+        return self._get(("tr",), build)
+
+    def atr(self, length: int) -> pd.Series:
+        return self._get(("atr", length), lambda: rma(self.tr(), length))
+
+    def hl2(self) -> pd.Series:
+        return self._get(("hl2",), lambda: (self.df["high"] + self.df["low"]) / 2.0)
+
+    def ema(self, source: str, length: int) -> pd.Series:
+        base = self.tr if source == "tr" else (lambda: self.df[source])
+        return self._get(("ema", source, length), lambda: ema(base(), length))
+
+    def rma(self, source: str, length: int) -> pd.Series:
+        return self._get(("rma", source, length), lambda: rma(self.df[source], length))
+
+
+# ---------------------------------------------------------------------------
+# Registry
+#
+# Each indicator declares the OHLCV inputs it reads (validated by
+# add_indicators), its lookback, the parameter tuple taken from the config
+# (the cache key for compute), the output columns and a vectorized signal
+# rule returning +1 (BUY), -1 (SELL), 0 (NEUTRAL) or NaN per row. Shared
+# intermediates are requested from the Intermediates cache inside compute.
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Indicator:
+    name: str
+    inputs: tuple[str, ...]
+    params: Callable[[dict], tuple]
+    lookback: Callable[[tuple], int]
+    columns: Callable[[tuple], dict[str, str]]
+    compute: Callable[[Intermediates, tuple], dict[str, pd.Series]]
+    signal: Callable[[pd.DataFrame, dict[str, str], dict], pd.Series]
+
+
+REGISTRY: dict[str, Indicator] = {}
+
+
+def register(ind: Indicator) -> Indicator:
+    REGISTRY[ind.name] = ind
+    return ind
+
+
+def _vote(buy: pd.Series, sell: pd.Series, valid: pd.Series, neutral: bool = True) -> pd.Series:
+    out = np.where(buy, 1.0, np.where(sell, -1.0, 0.0 if neutral else np.nan))
+    return pd.Series(out, index=valid.index).where(valid)
+
+
+# --- Keltner Channels: close above upper => BUY, below lower => SELL ---
+def _kc_compute(im: Intermediates, p: tuple) -> dict[str, pd.Series]:
+    length, mult = p
+    cols = _kc_columns(p)
+    basis = im.ema("close", length)
+    band = im.ema("tr", length)
+    return {
+        cols["lower"]: basis - mult * band,
+        cols["basis"]: basis,
+        cols["upper"]: basis + mult * band,
+    }
+
+def _kc_columns(p: tuple) -> dict[str, str]:
+    length, mult = p
+    return {"lower": f"KCL_{length}_{mult}", "basis": f"KCB_{length}_{mult}", "upper": f"KCU_{length}_{mult}"}
+
+def _kc_signal(df: pd.DataFrame, cols: dict[str, str], cfg: dict) -> pd.Series:
+    close, up, lo = df["close"], df[cols["upper"]], df[cols["lower"]]
+    return _vote(close > up, close < lo, up.notna() & lo.notna())
+
+register(Indicator(
+    name="keltner",
+    inputs=("high", "low", "close"),
+    params=lambda cfg: (int(cfg["keltner"]["length"]), float(cfg["keltner"]["mult"])),
+    lookback=lambda p: p[0],
+    columns=_kc_columns,
+    compute=_kc_compute,
+    signal=_kc_signal,
+))
+
+
+# --- Supertrend direction ---
+def _st_columns(p: tuple) -> dict[str, str]:
+    length, mult = p
+    return {"trend": f"SUPERT_{length}_{mult}", "dir": f"SUPERTd_{length}_{mult}"}
+
+def _st_compute(im: Intermediates, p: tuple) -> dict[str, pd.Series]:
+    length, mult = p
+    close = im.df["close"].to_numpy(dtype=float)
+    hl2 = im.hl2().to_numpy(dtype=float)
+    matr = mult * im.atr(length).to_numpy(dtype=float)
+    upper, lower = hl2 + matr, hl2 - matr
+    n = len(close)
+    direction = np.ones(n)
+    trend = np.full(n, np.nan)
+    # path-dependent band ratchet; plain loop over numpy arrays
+    for i in range(1, n):
+        if close[i] > upper[i - 1]:
+            direction[i] = 1
+        elif close[i] < lower[i - 1]:
+            direction[i] = -1
+        else:
+            direction[i] = direction[i - 1]
+            if direction[i] > 0 and lower[i] < lower[i - 1]:
+                lower[i] = lower[i - 1]
+            if direction[i] < 0 and upper[i] > upper[i - 1]:
+                upper[i] = upper[i - 1]
+        trend[i] = lower[i] if direction[i] > 0 else upper[i]
+    cols = _st_columns(p)
+    idx = im.df.index
+    return {cols["trend"]: pd.Series(trend, index=idx), cols["dir"]: pd.Series(direction, index=idx)}
+
+def _st_signal(df: pd.DataFrame, cols: dict[str, str], cfg: dict) -> pd.Series:
+    d = df[cols["dir"]]
+    return _vote(d == 1, d != 1, d.notna(), neutral=False)
+
+register(Indicator(
+    name="supertrend",
+    inputs=("high", "low", "close"),
+    params=lambda cfg: (int(cfg["supertrend"]["length"]), float(cfg["supertrend"]["multiplier"])),
+    lookback=lambda p: p[0],
+    columns=_st_columns,
+    compute=_st_compute,
+    signal=_st_signal,
+))
+
+
+# --- RSI thresholds ---
+def _rsi_compute(im: Intermediates, p: tuple) -> dict[str, pd.Series]:
+    (length,) = p
+    diff = im.df["close"].diff()
+    up = rma(diff.clip(lower=0), length)
+    down = rma(diff.clip(upper=0), length).abs()
+    return {f"RSI_{length}": 100 * up / (up + down)}
+
+def _rsi_signal(df: pd.DataFrame, cols: dict[str, str], cfg: dict) -> pd.Series:
+    rsi = df[cols["rsi"]]
+    return _vote(rsi >= cfg["rsi"]["buy"], rsi <= cfg["rsi"]["sell"], rsi.notna())
+
+register(Indicator(
+    name="rsi",
+    inputs=("close",),
+    params=lambda cfg: (int(cfg["rsi"]["length"]),),
+    lookback=lambda p: p[0] + 1,
+    columns=lambda p: {"rsi": f"RSI_{p[0]}"},
+    compute=_rsi_compute,
+    signal=_rsi_signal,
+))
+
+
+# --- Parabolic SAR: close above SAR => BUY else SELL ---
+def _psar_columns(p: tuple) -> dict[str, str]:
+    af, max_af = p
+    return {"psar": f"PSAR_{af}_{max_af}"}
+
+def _psar_compute(im: Intermediates, p: tuple) -> dict[str, pd.Series]:
+    af, max_af = p
+    d = im.df
+    ps = ta.psar(high=d["high"], low=d["low"], close=d["close"], af=af, max_af=max_af)
+    # long and short SAR are split into two half-empty columns; join them
+    sar = ps.iloc[:, 0].fillna(ps.iloc[:, 1])
+    return {_psar_columns(p)["psar"]: sar}
+
+def _psar_signal(df: pd.DataFrame, cols: dict[str, str], cfg: dict) -> pd.Series:
+    sar = df[cols["psar"]]
+    return _vote(df["close"] > sar, df["close"] <= sar, sar.notna(), neutral=False)
+
+register(Indicator(
+    name="psar",
+    inputs=("high", "low", "close"),
+    params=lambda cfg: (float(cfg["psar"]["af"]), float(cfg["psar"]["max_af"])),
+    lookback=lambda p: 2,
+    columns=_psar_columns,
+    compute=_psar_compute,
+    signal=_psar_signal,
+))
+
+
+# --- MACD: macd above signal => BUY, below => SELL ---
+def _macd_columns(p: tuple) -> dict[str, str]:
+    fast, slow, signal = p
+    sfx = f"{fast}_{slow}_{signal}"
+    return {"macd": f"MACD_{sfx}", "hist": f"MACDh_{sfx}", "signal": f"MACDs_{sfx}"}
+
+def _macd_compute(im: Intermediates, p: tuple) -> dict[str, pd.Series]:
+    fast, slow, signal = p
+    macd = im.ema("close", fast) - im.ema("close", slow)
+    # like pandas_ta, the signal EMA starts at the first valid MACD value
+    first = macd.first_valid_index()
+    sig = ema(macd.loc[first:], signal).reindex(macd.index) if first is not None else macd * np.nan
+    cols = _macd_columns(p)
+    return {cols["macd"]: macd, cols["hist"]: macd - sig, cols["signal"]: sig}
+
+def _macd_signal(df: pd.DataFrame, cols: dict[str, str], cfg: dict) -> pd.Series:
+    m, s = df[cols["macd"]], df[cols["signal"]]
+    return _vote(m > s, m < s, m.notna() & s.notna(), neutral=False)
+
+register(Indicator(
+    name="macd",
+    inputs=("close",),
+    params=lambda cfg: (int(cfg["macd"]["fast"]), int(cfg["macd"]["slow"]), int(cfg["macd"]["signal"])),
+    lookback=lambda p: p[1] + p[2],
+    columns=_macd_columns,
+    compute=_macd_compute,
+    signal=_macd_signal,
+))
+
+
+# ---------------------------------------------------------------------------
+
+OHLCV = ["open", "high", "low", "close", "volume"]
+
+
+def required_inputs() -> list[str]:
+    return list(dict.fromkeys(c for ind in REGISTRY.values() for c in ind.inputs))
+
+
+def required_rows(cfg: dict) -> int:
+    return max(ind.lookback(ind.params(cfg)) for ind in REGISTRY.values())
+
+
+def add_indicators(df: pd.DataFrame, *cfgs: dict) -> pd.DataFrame:
+    """
+    Add indicator columns for one or more configs (profiles). Each
+    indicator is computed once per distinct parameter tuple; column names
+    carry the parameters, so profiles sharing a setting share the column.
+    """
+    # Normalise OHLCV column case, then check what the indicators read
     cols = {c.lower(): c for c in df.columns}
-    rename = {}
-    for need in ["open", "high", "low", "close", "volume"]:
-        if need not in cols:
+    df = df.rename(columns={cols[k]: k for k in OHLCV if k in cols})
+    for need in required_inputs():
+        if need not in df.columns:
             raise ValueError(f"Missing column: {need}")
-        rename[cols[need]] = need
-    df = df.rename(columns=rename)
-
-    # Keltner Channels
-    kc = ta.kc(high=df["high"], low=df["low"], close=df["close"],
-               length=cfg["keltner"]["length"],
-               scalar=cfg["keltner"]["mult"])
-    df = pd.concat([df, kc], axis=1)
-
-    # Supertrend
-    st = ta.supertrend(high=df["high"], low=df["low"], close=df["close"],
-                       length=cfg["supertrend"]["length"],
-                       multiplier=cfg["supertrend"]["multiplier"])
-    df = pd.concat([df, st], axis=1)
-
-    # RSI
-    rsi = ta.rsi(df["close"], length=cfg["rsi"]["length"])
-    df["RSI"] = rsi
-
-    # Parabolic SAR
-    psar = ta.psar(high=df["high"], low=df["low"], close=df["close"],
-                   af=cfg["psar"]["af"], max_af=cfg["psar"]["max_af"])
-    df = pd.concat([df, psar], axis=1)
-
-    # MACD
-    macd = ta.macd(df["close"],
-                   fast=cfg["macd"]["fast"], slow=cfg["macd"]["slow"], signal=cfg["macd"]["signal"])
-    df = pd.concat([df, macd], axis=1)
-
-    return df
+
+    im = Intermediates(df)
+    out = {}
+    for ind in REGISTRY.values():
+        for p in dict.fromkeys(ind.params(cfg) for cfg in cfgs):
+            out.update(ind.compute(im, p))
+    return pd.concat([df, pd.DataFrame(out, index=df.index)], axis=1)
+
+
+def signal_frame(df: pd.DataFrame, cfg: dict) -> pd.DataFrame:
+    """Votes per indicator for every row (+1/-1/0, NaN during warm-up)."""
+    votes = {}
+    pos = np.arange(len(df))
+    for ind in REGISTRY.values():
+        p = ind.params(cfg)
+        v = ind.signal(df, ind.columns(p), cfg)
+        votes[ind.name] = v.where(pos >= ind.lookback(p) - 1)
+    return pd.DataFrame(votes, index=df.index)
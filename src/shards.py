@@ -0,0 +1,146 @@
+from __future__ import annotations
+import os, re, csv, glob, hashlib, heapq, zlib
+from typing import Iterator
+
+from src.transitions import indicator_names
+
+# Shard mode: each node scans the tickers whose stable hash lands in its
+# shard and writes one partial file per profile into a shared directory.
+# Every partial carries the run id in its name, so the merge only ever
+# combines files from the same run, and a header line with the shard count,
+# the universe fingerprint and the scan date, which all partials of the run
+# must agree on. The merge reads the partials back in tickers.csv order, so
+# the final alerts, state and exit code match a single-node run exactly.
+
+BASE_COLS = ["order", "ticker", "timestamp", "close", "buys", "sells", "consensus"]
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """'2/8' -> (2, 8); shards are numbered 0..N-1."""
+    try:
+        i, n = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected I/N") from None
+    if n < 1 or not 0 <= i < n:
+        raise ValueError(f"Invalid shard '{spec}', need 0 <= I < N")
+    return i, n
+
+
+RUN_ID_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9.\-]*")
+
+
+def check_run_id(run_id: str) -> str:
+    # no '_' so the id can't be confused with the profile/shard parts of a name
+    if not RUN_ID_RE.fullmatch(run_id or ""):
+        raise ValueError(f"Invalid run id '{run_id}', use letters, digits, '.' and '-'")
+    return run_id
+
+
+def shard_of(ticker: str, n: int) -> int:
+    # crc32, not hash(): must agree across processes and machines
+    return zlib.crc32(ticker.strip().upper().encode("utf-8")) % n
+
+
+def universe_key(universe: list[str]) -> str:
+    return hashlib.sha1("\n".join(universe).encode("utf-8")).hexdigest()[:16]
+
+
+def partial_path(shard_dir: str, profile: str, run_id: str, i: int, n: int) -> str:
+    return os.path.join(shard_dir, f"boris_partial_{profile}_{run_id}_{i:04d}of{n:04d}.csv")
+
+
+def write_partial(path: str, results: list[dict], order: dict[str, int], meta: dict[str, str]):
+    rows = sorted(results, key=lambda r: order[r["ticker"]])
+    names = indicator_names()
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="") as f:
+        f.write("# " + " ".join(f"{k}={v}" for k, v in meta.items()) + "\n")
+        w = csv.writer(f)
+        w.writerow(BASE_COLS + [f"v_{k}" for k in names])
+        for r in rows:
+            votes = r.get("votes", {})
+            w.writerow([order[r["ticker"]], r["ticker"], r["timestamp"], repr(r["close"]),
+                        r["buys"], r["sells"], r["consensus"]] +
+                       [votes.get(k, "") for k in names])
+    # readers only ever see complete files
+    os.replace(tmp, path)
+
+
+def read_meta(path: str) -> dict[str, str]:
+    with open(path, newline="") as f:
+        line = f.readline()
+    if not line.startswith("# "):
+        return {}
+    return dict(kv.partition("=")[::2] for kv in line[2:].split())
+
+
+def _read(path: str) -> Iterator[tuple[int, dict]]:
+    # votes are taken from whatever v_* columns the file has, so a partial
+    # written before an indicator was added or removed still reads cleanly
+    with open(path, newline="") as f:
+        for row in csv.DictReader(line for line in f if not line.startswith("#")):
+            yield int(row["order"]), {
+                "ticker": row["ticker"],
+                "timestamp": row["timestamp"],
+                "close": float(row["close"]),
+                "buys": int(row["buys"]),
+                "sells": int(row["sells"]),
+                "consensus": row["consensus"],
+                "votes": {k[2:]: v for k, v in row.items() if k.startswith("v_") and v},
+            }
+
+
+def run_partials(shard_dir: str, profile: str, run_id: str) -> dict[tuple[int, int], str]:
+    """All partials of one profile and run, keyed by (shard, count)."""
+    pat = re.compile(rf"boris_partial_{re.escape(profile)}_{re.escape(run_id)}_(\d{{4}})of(\d{{4}})\.csv")
+    out = {}
+    for path in glob.glob(os.path.join(glob.escape(shard_dir), "boris_partial_*.csv")):
+        m = pat.fullmatch(os.path.basename(path))
+        if m:
+            out[(int(m.group(1)), int(m.group(2)))] = path
+    return out
+
+
+def detect_shard_count(shard_dir: str, profile: str, run_id: str) -> int | None:
+    counts = {n for _, n in run_partials(shard_dir, profile, run_id)}
+    return counts.pop() if len(counts) == 1 else None
+
+
+def missing_partials(shard_dir: str, profile: str, run_id: str, n: int) -> list[int]:
+    found = run_partials(shard_dir, profile, run_id)
+    return [i for i in range(n) if (i, n) not in found]
+
+
+def mismatched_partials(shard_dir: str, profile: str, run_id: str, n: int,
+                        universe: list[str]) -> list[str]:
+    """Problems with the partials of one run; empty if they belong together."""
+    expect = {"run": run_id, "shards": str(n), "universe": universe_key(universe)}
+    problems, dates = [], set()
+    for i in range(n):
+        path = partial_path(shard_dir, profile, run_id, i, n)
+        meta = read_meta(path)
+        bad = [k for k, v in expect.items() if meta.get(k) != v]
+        if bad or "date" not in meta:
+            problems.append(f"{os.path.basename(path)}: {', '.join(bad or ['date'])} mismatch")
+        dates.add(meta.get("date"))
+    if len(dates) > 1:
+        problems.append(f"partials were scanned on different dates {sorted(d or '?' for d in dates)}")
+    return problems
+
+
+def iter_merged(shard_dir: str, profile: str, run_id: str, n: int) -> Iterator[dict]:
+    """
+    k-way merge of the sorted partials into tickers.csv order. The caller
+    collects the rows: the state diff in finalize needs the full set.
+    """
+    streams = [_read(partial_path(shard_dir, profile, run_id, i, n)) for i in range(n)]
+    for _, row in heapq.merge(*streams, key=lambda x: x[0]):
+        yield row
+
+
+def remove_partials(shard_dir: str, profile: str, run_id: str, n: int):
+    for i in range(n):
+        try:
+            os.remove(partial_path(shard_dir, profile, run_id, i, n))
+        except FileNotFoundError:
+            pass
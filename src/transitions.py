@@ -0,0 +1,119 @@
+from __future__ import annotations
+import os
+import numpy as np
+import pandas as pd
+
+from src.indicators import REGISTRY
+
+# Per-ticker state persisted between runs, so the scanner can report only
+# what changed (new alerts, upgrades/downgrades, flips) instead of the
+# same label every day while a condition holds.
+
+VOTE = {"BUY": 1, "SELL": -1, "NEUTRAL": 0}
+TIERS = {"GOOD": 1, "STRONG": 2, "DIAMOND": 3}
+
+
+def indicator_names() -> list[str]:
+    # read at call time, so a newly registered indicator gets a vote column
+    return list(REGISTRY)
+
+
+def state_cols() -> list[str]:
+    return ["ticker", "date", "consensus", "buys", "sells"] + [f"v_{k}" for k in indicator_names()]
+
+
+def signed_tier(labels: pd.Series, min_tier: int = 1) -> np.ndarray:
+    """DIAMOND BUY -> +3 ... GOOD SELL -> -1, NONE (or below min_tier) -> 0."""
+    lab = labels.fillna("NONE").astype(str).str.upper()
+    parts = lab.str.split(" ", n=1, expand=True).reindex(columns=[0, 1])
+    tier = parts[0].map(TIERS).fillna(0).astype(np.int8).to_numpy()
+    tier = np.where(tier >= min_tier, tier, 0)
+    sign = np.where(parts[1] == "BUY", 1, np.where(parts[1] == "SELL", -1, 0))
+    return (sign * tier).astype(np.int8)
+
+
+def results_state(rows: list[dict]) -> pd.DataFrame:
+    names = indicator_names()
+    recs = []
+    for r in rows:
+        votes = r.get("votes", {})
+        rec = {
+            "ticker": r["ticker"],
+            "date": r.get("timestamp"),
+            "consensus": r.get("consensus", "NONE"),
+            "buys": r.get("buys", 0),
+            "sells": r.get("sells", 0),
+        }
+        for k in names:
+            rec[f"v_{k}"] = VOTE.get(votes.get(k), 0)
+        recs.append(rec)
+    df = pd.DataFrame(recs, columns=state_cols())
+    for k in names:
+        df[f"v_{k}"] = df[f"v_{k}"].astype(np.int8)
+    return df
+
+
+def load_state(path: str) -> pd.DataFrame:
+    if not os.path.exists(path):
+        return results_state([])
+    df = pd.read_csv(path, dtype={"ticker": str, "consensus": str})
+    # votes of newly registered indicators start at 0; columns of removed
+    # ones are dropped by the reindex
+    for k in indicator_names():
+        col = f"v_{k}"
+        df[col] = df[col].fillna(0).astype(np.int8) if col in df.columns else np.int8(0)
+    return df.reindex(columns=state_cols())
+
+
+def save_state(prev: pd.DataFrame, cur: pd.DataFrame, universe: list[str], path: str):
+    # tickers that failed this run keep their previous state, so a missed
+    # fetch does not show up as CLEARED followed by NEW on the next run
+    keep = prev[prev["ticker"].isin(universe) & ~prev["ticker"].isin(cur["ticker"])]
+    out = pd.concat([cur, keep], ignore_index=True) if not keep.empty else cur
+    tmp = path + ".tmp"
+    out.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def diff_states(prev: pd.DataFrame, cur: pd.DataFrame, min_tier: int = 1) -> pd.DataFrame:
+    """
+    Compare this run against the stored state and return one row per ticker
+    whose alert level changed. `change` is one of NEW, UPGRADE, DOWNGRADE,
+    CLEARED or FLIP; `changed` lists the indicators whose vote moved.
+    """
+    names = indicator_names()
+    vcols = [f"v_{k}" for k in names]
+    p = prev[["ticker", "consensus"] + vcols].rename(
+        columns={"consensus": "prev_consensus", **{c: f"p_{c}" for c in vcols}})
+    m = cur.merge(p, on="ticker", how="left")
+    m["prev_consensus"] = m["prev_consensus"].fillna("NONE")
+
+    now = signed_tier(m["consensus"], min_tier)
+    before = signed_tier(m["prev_consensus"], min_tier)
+    same_side = np.sign(now) == np.sign(before)
+
+    change = np.select(
+        [
+            (before == 0) & (now != 0),
+            (now == 0) & (before != 0),
+            (before != 0) & (now != 0) & ~same_side,
+            same_side & (np.abs(now) > np.abs(before)),
+            same_side & (np.abs(now) < np.abs(before)),
+        ],
+        ["NEW", "CLEARED", "FLIP", "UPGRADE", "DOWNGRADE"],
+        default="",
+    )
+    m["change"] = change
+    m = m[m["change"] != ""].copy()
+    if m.empty:
+        return pd.DataFrame(columns=["date", "ticker", "change", "prev_consensus",
+                                     "consensus", "buys", "sells", "changed"])
+
+    cur_v = m[vcols].to_numpy()
+    prev_v = m[[f"p_{c}" for c in vcols]].fillna(0).to_numpy()
+    moved = cur_v != prev_v
+    names = np.array(names)
+    m["changed"] = [";".join(names[row]) for row in moved]
+
+    return m[["date", "ticker", "change", "prev_consensus", "consensus",
+              "buys", "sells", "changed"]].reset_index(drop=True)
@@ -18,5 +18,57 @@ def now_str(tz_name: str) -> str:
     tzinfo = tz.gettz(tz_name)
     return datetime.now(tzinfo).strftime("%Y-%m-%d %H:%M:%S %Z")
 
+def today_str(tz_name: str) -> str:
+    return datetime.now(tz.gettz(tz_name)).strftime("%Y-%m-%d")
+
 def ensure_dir(path: str):
     os.makedirs(path, exist_ok=True)
+
+DEFAULT_PROFILE = "default"
+
+def deep_merge(base: dict, over: dict) -> dict:
+    out = dict(base)
+    for k, v in (over or {}).items():
+        if isinstance(v, dict) and isinstance(out.get(k), dict):
+            out[k] = deep_merge(out[k], v)
+        else:
+            out[k] = v
+    return out
+
+def load_profiles(cfg: dict) -> dict[str, dict]:
+    """
+    Named risk profiles from the `profiles:` section, each merged over the
+    top-level settings. Without that section the config is the single
+    "default" profile. Fetch settings (period, interval) are always shared.
+    """
+    base = {k: v for k, v in cfg.items() if k != "profiles"}
+    profiles = cfg.get("profiles") or {}
+    if not profiles:
+        return {DEFAULT_PROFILE: base}
+    out = {}
+    for name, over in profiles.items():
+        p = deep_merge(base, over)
+        p["period"], p["interval"] = base["period"], base["interval"]
+        out[str(name)] = p
+    return out
+
+def out_path(outdir: str, stem: str, profile: str) -> str:
+    # the default profile keeps the historical file names
+    suffix = "" if profile == DEFAULT_PROFILE else f"_{profile}"
+    return os.path.join(outdir, f"{stem}{suffix}.csv")
+
+def report_profile(cfg: dict) -> str:
+    """The profile that gets published: report_profile, else the first one."""
+    profiles = load_profiles(cfg)
+    name = cfg.get("report_profile") or next(iter(profiles))
+    if name not in profiles:
+        raise ValueError(f"report_profile '{name}' not found; profiles: {', '.join(profiles)}")
+    return name
+
+def report_alerts_path(root: str) -> str:
+    """Alerts CSV the report/server should read by default, per config.yaml."""
+    path = os.path.join(root, "config.yaml")
+    if not os.path.exists(path):
+        return "boris_alerts.csv"
+    cfg = load_cfg(path) or {}
+    return out_path(cfg.get("output_dir", "."), "boris_alerts", report_profile(cfg))